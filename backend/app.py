@@ -1,22 +1,51 @@
 import sys
 import os
-import json
+import hashlib
 import logging
-import subprocess
 import jwt
+import msgspec
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from flask import Flask, request, jsonify, send_from_directory, make_response, abort
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory, make_response, g
+from flask.json.provider import DefaultJSONProvider
 
 from flask_cors import CORS
+from werkzeug.exceptions import HTTPException
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from schemas import parse_deployment_request
 from yaml_generator import generate_yaml
-from okd_api import get_namespaces, get_storage_classes, authenticate_to_okd, execute_oc_command, check_auth_status
+from okd_api import get_namespaces, get_storage_classes, get_cluster_bundle, authenticate_to_okd, apply_manifests, check_auth_status
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for jsonify() and request.get_json()"""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+# Built React frontend, served by serve_frontend/static_proxy below
+FRONTEND_BUILD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "build")
 
 # Initialize Flask app
-app = Flask(__name__, static_folder="frontend/build", static_url_path="/")
+# Flask's own static route is disabled: mounted at "/" it would shadow static_proxy for every path
+app = Flask(__name__, static_folder=None)
+app.json = OrjsonProvider(app)
 CORS(app)
 
+# Let a fronting nginx serve static file bodies (X-Accel-Redirect) instead of streaming them through Python
+STATIC_ACCEL_PREFIX = os.getenv("STATIC_ACCEL_PREFIX", "")
+app.config["USE_X_SENDFILE"] = bool(STATIC_ACCEL_PREFIX)
+
 # Logging Configuration
 logging.basicConfig(
     level=logging.INFO,
@@ -30,8 +59,38 @@ OKD_SERVICE_ACCOUNT_TOKEN = os.getenv("OKD_SERVICE_ACCOUNT_TOKEN", "missing-clus
 AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN", "")
 API_IDENTIFIER = os.getenv("API_IDENTIFIER", "")
 AUTH0_NAMESPACE = os.getenv("AUTH0_NAMESPACE", "")
+AUTH0_NAMESPACE_ROLES = f"{AUTH0_NAMESPACE}_roles"
 ADMIN_ROLE_NAME = os.getenv("ADMIN_ROLE_NAME", "")
 
+def load_index_html():
+    """Read index.html once at startup - the build directory does not change while running"""
+    try:
+        with open(os.path.join(FRONTEND_BUILD_DIR, "index.html"), "rb") as index_file:
+            return index_file.read()
+    except OSError:
+        logger.warning("Frontend index.html not found at startup, serving it from disk")
+        return None
+
+def list_static_files():
+    """Collect the relative paths of all frontend build files once at startup"""
+    static_files = set()
+    for root, _, files in os.walk(FRONTEND_BUILD_DIR):
+        for name in files:
+            relative_path = os.path.relpath(os.path.join(root, name), FRONTEND_BUILD_DIR)
+            static_files.add(relative_path.replace(os.sep, "/"))
+    return frozenset(static_files)
+
+INDEX_HTML = load_index_html()
+INDEX_ETAG = hashlib.blake2b(INDEX_HTML, digest_size=16).hexdigest() if INDEX_HTML else None
+STATIC_FILES = list_static_files()
+
+# Worker pool for dispatching batched API calls in parallel
+executor = ThreadPoolExecutor(max_workers=4)
+BATCH_MAX_ROUTES = 10
+
+# Auth0 signing keys are fetched once and cached in-process by key id
+jwks_client = jwt.PyJWKClient(f"https://{AUTH0_DOMAIN}/.well-known/jwks.json", cache_keys=True, lifespan=3600)
+
 # JWT auth validation
 def get_token_auth_header():
     """Get the access token from the header"""
@@ -54,6 +113,20 @@ def get_token_auth_header():
     token = parts[1]
     return token
 
+def get_token_payload():
+    """Verify and decode the access token once per request and reuse it across decorators"""
+    if "jwt_payload" not in g:
+        token = get_token_auth_header()
+        signing_key = jwks_client.get_signing_key_from_jwt(token).key
+        g.jwt_payload = jwt.decode(
+            token,
+            signing_key,
+            algorithms=["RS256"],
+            audience=API_IDENTIFIER,
+            issuer=f"https://{AUTH0_DOMAIN}/"
+        )
+    return g.jwt_payload
+
 def requires_auth(f):
     """Determines if the access token is valid"""
     @wraps(f)
@@ -64,9 +137,8 @@ def requires_auth(f):
             return jsonify({"status": "error", "message": "Authentication required"}), 401
 
         try:
-            # This is a lightweight verification that the token is well-formed
-            # For production, you should verify the token with Auth0
-            jwt_payload = jwt.decode(token, options={"verify_signature": False})
+            # Verify the token signature, audience and issuer against Auth0
+            get_token_payload()
             return f(*args, **kwargs)
         except jwt.ExpiredSignatureError:
             logger.warning("Token expired")
@@ -74,6 +146,9 @@ def requires_auth(f):
         except jwt.InvalidTokenError:
             logger.warning("Invalid token")
             return jsonify({"status": "error", "message": "Invalid token"}), 401
+        except jwt.PyJWKClientError as e:
+            logger.warning("Unable to get signing key: %s", e)
+            return jsonify({"status": "error", "message": "Unable to verify token"}), 401
 
     return decorated
 
@@ -87,24 +162,19 @@ def requires_admin(f):
             return jsonify({"status": "error", "message": "Authentication required"}), 401
 
         try:
-            # This is a lightweight verification that the token contains the admin role
-            # For production, you should verify the token with Auth0
-            jwt_payload = jwt.decode(token, options={"verify_signature": False})
+            # Verified payload is shared with requires_auth
+            jwt_payload = get_token_payload()
 
-            # Check if user has admin role in either format
-            namespace = AUTH0_NAMESPACE
-            namespace_roles = f"{namespace}_roles"
-
-            # Try both formats: plain namespace and namespace_roles
-            roles = jwt_payload.get(namespace, []) or jwt_payload.get(namespace_roles, [])
+            # Check if user has admin role in either format: plain namespace and namespace_roles
+            roles = jwt_payload.get(AUTH0_NAMESPACE) or jwt_payload.get(AUTH0_NAMESPACE_ROLES) or []
             if not isinstance(roles, list):
                 roles = []
 
-            logger.info(f"User roles: {roles}, Admin role: {ADMIN_ROLE_NAME}")
-            logger.info(f"Checking for roles in: {namespace} or {namespace_roles}")
+            logger.debug("User roles: %s, Admin role: %s", roles, ADMIN_ROLE_NAME)
+            logger.debug("Checking for roles in: %s or %s", AUTH0_NAMESPACE, AUTH0_NAMESPACE_ROLES)
 
             if ADMIN_ROLE_NAME not in roles:
-                logger.warning(f"User does not have admin role ({ADMIN_ROLE_NAME})")
+                logger.warning("User does not have admin role (%s)", ADMIN_ROLE_NAME)
                 return jsonify({
                     "status": "error",
                     "message": f"Access denied. Admin privileges required ({ADMIN_ROLE_NAME})."
@@ -117,18 +187,40 @@ def requires_admin(f):
         except jwt.InvalidTokenError:
             logger.warning("Invalid token")
             return jsonify({"status": "error", "message": "Invalid token"}), 401
+        except jwt.PyJWKClientError as e:
+            logger.warning("Unable to get signing key: %s", e)
+            return jsonify({"status": "error", "message": "Unable to verify token"}), 401
         except Exception as e:
-            logger.error(f"Error in admin role check: {str(e)}", exc_info=True)
+            logger.error("Error in admin role check: %s", e, exc_info=True)
             return jsonify({"status": "error", "message": f"Authentication error: {str(e)}"}), 500
 
     return decorated
 
 
+def cached_json_response(result):
+    """ Build a JSON response clients may cache for 5 minutes and revalidate with If-None-Match """
+    response = make_response(jsonify(result))
+    response.headers['Cache-Control'] = 'max-age=300'  # Cache for 5 minutes
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def index_response():
+    """ Serve index.html from memory, answering If-None-Match revalidations with 304 """
+    if INDEX_HTML is None:
+        return send_from_directory(FRONTEND_BUILD_DIR, "index.html")
+
+    response = Response(INDEX_HTML, mimetype="text/html")
+    response.set_etag(INDEX_ETAG)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
 @app.route("/")
 def serve_frontend():
     """ Serve the React frontend. """
     logger.info("Serving frontend index.html")
-    return send_from_directory(app.static_folder, "index.html")
+    return index_response()
 
 
 # Update to the generate-yaml API endpoint in app.py
@@ -142,7 +234,7 @@ def generate_yaml_api():
         if not data:
             return jsonify({"status": "error", "message": "Invalid input"}), 400
 
-        logger.info(f"Generating YAML for request with namespace '{data.get('namespace')}'")
+        logger.info("Generating YAML for request with namespace '%s'", data.get("namespace"))
 
         # Extract and validate critical fields
         namespace = data.get("namespace")
@@ -153,15 +245,18 @@ def generate_yaml_api():
         create_new = data.get("createNewNamespace", False)
         requester = data.get("requesterNickname", "")
         if create_new:
-            logger.info(f"Creating new namespace '{namespace}' with requester '{requester}'")
+            logger.info("Creating new namespace '%s' with requester '%s'", namespace, requester)
         else:
-            logger.info(f"Using existing namespace '{namespace}'")
+            logger.info("Using existing namespace '%s'", namespace)
 
-        yaml_output = generate_yaml(data)
+        yaml_output = generate_yaml(parse_deployment_request(data))
         return jsonify({"status": "success", "yaml": yaml_output})
 
+    except msgspec.ValidationError as e:
+        logger.warning("Rejected invalid YAML generation request: %s", e)
+        return jsonify({"status": "error", "message": f"Invalid input: {e}"}), 400
     except Exception as e:
-        logger.error(f"Error generating YAML: {str(e)}", exc_info=True)
+        logger.error("Error generating YAML: %s", e, exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
@@ -173,7 +268,7 @@ def deploy_to_okd():
     """ API to deploy YAML to OpenShift """
     try:
         data = request.get_json()
-        logger.info(f"Received OpenShift deployment request for namespace '{data.get('namespace')}'")
+        logger.info("Received OpenShift deployment request for namespace '%s'", data.get("namespace"))
 
         # Log if this is a new namespace creation with requester info
         namespace = data.get("namespace")
@@ -181,36 +276,26 @@ def deploy_to_okd():
         requester = data.get("requesterNickname", "")
 
         if create_new:
-            logger.info(f"Creating new namespace '{namespace}' with requester '{requester}'")
+            logger.info("Creating new namespace '%s' with requester '%s'", namespace, requester)
         else:
-            logger.info(f"Using existing namespace '{namespace}'")
-
-        # Generate YAML
-        yaml_content = generate_yaml(data)
-        yaml_file_path = "/tmp/generated.yaml"
-
-        # Save YAML to a file
-        with open(yaml_file_path, "w") as yaml_file:
-            yaml_file.write(yaml_content)
+            logger.info("Using existing namespace '%s'", namespace)
 
-        # Authenticate to OpenShift and apply YAML
-        if not authenticate_to_okd():
-            logger.error("Failed to authenticate to OpenShift")
-            return jsonify({"status": "error", "message": "Failed to authenticate to OpenShift cluster"}), 500
-
-        # Apply the YAML
-        apply_cmd = f"oc apply -f {yaml_file_path}"
-        result = execute_oc_command(apply_cmd)
+        # Generate YAML and apply it directly through the OpenShift API
+        yaml_content = generate_yaml(parse_deployment_request(data))
+        result = apply_manifests(yaml_content)
 
         if result.get("status") == "error":
-            logger.error(f"Deployment error: {result.get('message')}")
+            logger.error("Deployment error: %s", result.get("message"))
             return jsonify({"status": "error", "message": result.get("message")}), 500
 
         logger.info("Successfully deployed YAML to OpenShift!")
         return jsonify({"status": "success", "message": "Deployment successful!"})
 
+    except msgspec.ValidationError as e:
+        logger.warning("Rejected invalid deployment request: %s", e)
+        return jsonify({"status": "error", "message": f"Invalid input: {e}"}), 400
     except Exception as e:
-        logger.error(f"Unexpected error during deployment: {str(e)}", exc_info=True)
+        logger.error("Unexpected error during deployment: %s", e, exc_info=True)
         return jsonify({"status": "error", "message": f"Unexpected error: {str(e)}"}), 500
 
 
@@ -220,12 +305,8 @@ def fetch_cluster_data():
     """ API to fetch both namespaces and storage classes in a single call """
     logger.info("Fetching all cluster data (namespaces and storage classes)")
     try:
-        # Process in parallel - authenticate once at the beginning
-        authenticate_to_okd()
-
-        # Get both resources (with caching)
-        namespaces_result = get_namespaces(use_cache=True)
-        storage_classes_result = get_storage_classes(use_cache=True)
+        # Get both resources with a single cluster call (with caching)
+        namespaces_result, storage_classes_result = get_cluster_bundle(use_cache=True)
 
         # Combine the results
         result = {
@@ -242,13 +323,10 @@ def fetch_cluster_data():
         if storage_classes_result.get("status") == "error":
             result["storageClassesError"] = storage_classes_result.get("message")
 
-        # Set cache headers
-        response = make_response(jsonify(result))
-        response.headers['Cache-Control'] = 'max-age=300'  # Cache for 5 minutes
-        return response
+        return cached_json_response(result)
 
     except Exception as e:
-        logger.error(f"Unexpected error fetching cluster data: {str(e)}", exc_info=True)
+        logger.error("Unexpected error fetching cluster data: %s", e, exc_info=True)
         return jsonify({
             "status": "error",
             "message": f"Unexpected error: {str(e)}",
@@ -265,16 +343,13 @@ def fetch_namespaces():
     try:
         result = get_namespaces()
         if "status" in result and result["status"] == "error":
-            logger.error(f"Error fetching namespaces: {result.get('message', 'Unknown error')}")
+            logger.error("Error fetching namespaces: %s", result.get("message", "Unknown error"))
             return jsonify(result), 500
 
-        # Set cache headers
-        response = make_response(jsonify(result))
-        response.headers['Cache-Control'] = 'max-age=300'  # Cache for 5 minutes
-        return response
+        return cached_json_response(result)
 
     except Exception as e:
-        logger.error(f"Unexpected error in fetch_namespaces: {str(e)}", exc_info=True)
+        logger.error("Unexpected error in fetch_namespaces: %s", e, exc_info=True)
         return jsonify({"status": "error", "message": f"Unexpected error: {str(e)}"}), 500
 
 
@@ -286,16 +361,13 @@ def fetch_storage_classes():
     try:
         result = get_storage_classes()
         if "status" in result and result["status"] == "error":
-            logger.error(f"Error fetching storage classes: {result.get('message', 'Unknown error')}")
+            logger.error("Error fetching storage classes: %s", result.get("message", "Unknown error"))
             return jsonify(result), 500
 
-        # Set cache headers
-        response = make_response(jsonify(result))
-        response.headers['Cache-Control'] = 'max-age=300'  # Cache for 5 minutes
-        return response
+        return cached_json_response(result)
 
     except Exception as e:
-        logger.error(f"Unexpected error in fetch_storage_classes: {str(e)}", exc_info=True)
+        logger.error("Unexpected error in fetch_storage_classes: %s", e, exc_info=True)
         return jsonify({"status": "error", "message": f"Unexpected error: {str(e)}"}), 500
 
 
@@ -313,10 +385,55 @@ def check_authentication():
         else:
             return jsonify({"status": "error", "message": "Failed to authenticate to OpenShift cluster"}), 401
     except Exception as e:
-        logger.error(f"Unexpected error during authentication: {str(e)}", exc_info=True)
+        logger.error("Unexpected error during authentication: %s", e, exc_info=True)
         return jsonify({"status": "error", "message": f"Unexpected error: {str(e)}"}), 500
 
 
+# Endpoints a batch may not call: the batch itself and the SPA routes that match any other path
+BATCH_EXCLUDED_ENDPOINTS = frozenset({"batch_api", "static_proxy", "serve_frontend"})
+
+def is_batchable_route(route):
+    """ Check that a batch route is a string naming an existing GET API endpoint """
+    if not isinstance(route, str) or not route.startswith("/api/"):
+        return False
+    try:
+        endpoint, _ = app.url_map.bind("localhost").match(route.partition("?")[0], method="GET")
+    except HTTPException:  # unknown path, wrong method, or a redirect
+        return False
+    return endpoint not in BATCH_EXCLUDED_ENDPOINTS
+
+
+def dispatch_get(route, headers):
+    """ Run a GET API call in-process and return its status code and JSON body """
+    response = app.test_client().get(route, headers=headers)
+    return {"status": response.status_code, "body": response.get_json(silent=True)}
+
+
+@app.route("/api/batch", methods=["POST"])
+@requires_auth
+def batch_api():
+    """ API to run several GET API calls in a single round trip """
+    routes = request.get_json(silent=True)
+    if not isinstance(routes, list) or not 0 < len(routes) <= BATCH_MAX_ROUTES:
+        return jsonify({"status": "error", "message": f"Expected a list of 1-{BATCH_MAX_ROUTES} API routes"}), 400
+
+    invalid = [route for route in routes if not is_batchable_route(route)]
+    if invalid:
+        return jsonify({"status": "error", "message": f"Invalid batch routes: {invalid}"}), 400
+
+    # Responses are keyed by route, so a repeated route would silently collapse into one entry
+    if len(set(routes)) != len(routes):
+        return jsonify({"status": "error", "message": "Duplicate batch routes"}), 400
+
+    logger.info("Dispatching batch of %d API calls", len(routes))
+    headers = {"Authorization": request.headers.get("Authorization", "")}
+    futures = {route: executor.submit(dispatch_get, route, headers) for route in routes}
+    return jsonify({
+        "status": "success",
+        "responses": {route: future.result() for route, future in futures.items()}
+    })
+
+
 @app.route("/api/check-admin", methods=["GET"])
 @requires_auth
 @requires_admin
@@ -338,12 +455,12 @@ def debug_token():
         return jsonify({"status": "error", "message": "No token provided"}), 400
 
     try:
-        # Decode the token without verification
-        payload = jwt.decode(token, options={"verify_signature": False})
+        # Reuse the payload already decoded by requires_auth
+        payload = get_token_payload()
 
         # Extract roles information for debugging
         namespace = AUTH0_NAMESPACE
-        namespace_roles = f"{namespace}_roles"
+        namespace_roles = AUTH0_NAMESPACE_ROLES
 
         roles_plain = payload.get(namespace, [])
         roles_with_suffix = payload.get(namespace_roles, [])
@@ -361,7 +478,7 @@ def debug_token():
 
         return jsonify(debug_info)
     except Exception as e:
-        logger.error(f"Error decoding token: {str(e)}", exc_info=True)
+        logger.error("Error decoding token: %s", e, exc_info=True)
         return jsonify({"status": "error", "message": f"Token decode error: {str(e)}"}), 500
 
 
@@ -369,23 +486,28 @@ def debug_token():
 @app.route("/<path:path>")
 def static_proxy(path):
     """ Serve static assets and fallback to index.html for SPA """
-    file_path = os.path.join(app.static_folder, path)
-    if os.path.exists(file_path):
-        return send_from_directory(app.static_folder, path)
-    return send_from_directory(app.static_folder, "index.html")
+    if path in STATIC_FILES:
+        return send_file(os.path.join(FRONTEND_BUILD_DIR, path), conditional=True)
+    return index_response()
+
+
+@app.after_request
+def accel_redirect_static(response):
+    """ Translate Flask's X-Sendfile header into nginx's X-Accel-Redirect """
+    file_path = response.headers.pop("X-Sendfile", None)
+    if file_path:
+        relative_path = os.path.relpath(file_path, FRONTEND_BUILD_DIR)
+        response.headers["X-Accel-Redirect"] = f"{STATIC_ACCEL_PREFIX.rstrip('/')}/{relative_path}"
+    return response
 
 
 if __name__ == "__main__":
     logger.info("Starting OKD Deployment App...")
-    logger.info(f"Admin role configured as: '{ADMIN_ROLE_NAME}'")
+    logger.info("Admin role configured as: '%s'", ADMIN_ROLE_NAME)
 
     if not AUTH0_DOMAIN or not API_IDENTIFIER or not AUTH0_NAMESPACE:
         logger.warning("Auth0 configuration missing. Authentication may not work properly.")
 
-    # Try to authenticate at startup
-    if authenticate_to_okd():
-        logger.info("Successfully authenticated to OpenShift cluster at startup")
-    else:
-        logger.warning("Failed to authenticate to OpenShift cluster at startup. Will retry when needed.")
-
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # Local development server only - the container serves the app with gunicorn (gunicorn.conf.py)
+    # Set FLASK_DEBUG=1 to enable the debugger and reloader
+    app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,10 @@
+import os
+
+# Gunicorn settings for the container image (see CMD in Dockerfile)
+bind = "0.0.0.0:5000"
+# Fixed default: the host CPU count ignores container CPU limits and every worker keeps its own caches
+workers = int(os.getenv("GUNICORN_WORKERS") or 2)
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS") or 8)
+timeout = 120
+worker_tmp_dir = "/tmp/gunicorn"
@@ -1,9 +1,15 @@
 import json
 import logging
-import subprocess
 import os
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
+import ijson
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import yaml
 from flask import jsonify
 
 logger = logging.getLogger(__name__)
@@ -12,10 +18,45 @@ logger = logging.getLogger(__name__)
 OKD_CLUSTER_API = os.getenv("OKD_CLUSTER_API", "https://missing-cluster-api.com")
 OKD_SERVICE_ACCOUNT_TOKEN = os.getenv("OKD_SERVICE_ACCOUNT_TOKEN", "missing-cluster-sa-token")
 
-# Set kubeconfig to writable dir. Set env_var KUBECONFIG in deployment
-kube_config = os.getenv("KUBECONFIG", os.path.expanduser("~/.kube/config"))
-kube_dir = os.path.dirname(kube_config)
-os.makedirs(kube_dir, exist_ok=True)
+# Shared HTTPS session for direct Kubernetes API calls (keeps connections alive between requests)
+# TLS verification is skipped, like the previous `oc login --insecure-skip-tls-verify`
+api_session = requests.Session()
+api_session.headers["Authorization"] = f"Bearer {OKD_SERVICE_ACCOUNT_TOKEN}"
+api_session.verify = False
+api_session.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,  # enough keep-alive connections for every gunicorn thread in a worker
+    max_retries=Retry(total=2, backoff_factor=0.2)
+))
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+API_TIMEOUT = 30  # seconds
+FIELD_MANAGER = "okd-deploy-webui"
+ERROR_CACHE_TTL = 10  # seconds to keep failed lookups, so a broken cluster is not hammered
+INFLIGHT_WAIT_TIMEOUT = 30  # seconds to wait for another thread's fetch of the same data
+STALE_CACHE_TTL = 600  # seconds an expired lookup may still be served while it is refreshed in the background
+AUTH_FAILURE_TTL = 10  # seconds before a rejected token is checked against the API again
+
+# Kubernetes/OpenShift REST endpoints
+WHOAMI_PATH = "/apis/user.openshift.io/v1/users/~"
+NAMESPACES_PATH = "/api/v1/namespaces"
+STORAGE_CLASSES_PATH = "/apis/storage.k8s.io/v1/storageclasses"
+
+# Worker threads for cluster lookups that can run side by side
+fetch_executor = ThreadPoolExecutor(max_workers=2)
+
+# Namespaces with these prefixes belong to the platform and are hidden from users
+SYSTEM_NAMESPACE_PREFIXES = ("openshift-", "kube-")
+
+# REST plural name and scope for every kind produced by yaml_generator
+RESOURCE_TYPES = {
+    "Namespace": ("namespaces", False),
+    "Deployment": ("deployments", True),
+    "Service": ("services", True),
+    "PersistentVolumeClaim": ("persistentvolumeclaims", True),
+    "ConfigMap": ("configmaps", True),
+    "Secret": ("secrets", True),
+    "Route": ("routes", True),
+}
 
 # Global authentication state with thread safety
 class OKDSession:
@@ -23,30 +64,62 @@ class OKDSession:
         self.authenticated = False
         self.last_auth_time = 0
         self.auth_lock = threading.Lock()
-        self.auth_token_expiry = 3600  # Token valid for 1 hour (in seconds)
+        self.auth_token_expiry = 12 * 3600  # Service account tokens are long-lived; re-validate every 12 hours
+        self.auth_retry_after = 0  # Monotonic time before which a failed authentication is not retried
         # Cache for API responses to reduce redundant calls
-        self.cache = {
-            "namespaces": {"data": None, "timestamp": 0, "ttl": 300},  # 5 minutes TTL
-            "storage_classes": {"data": None, "timestamp": 0, "ttl": 300}  # 5 minutes TTL
+        # Entries are (data, fresh deadline, stale deadline) tuples on the monotonic clock,
+        # replaced atomically so readers never need a lock
+        self.cache_ttl = {
+            "namespaces": 300,  # 5 minutes TTL
+            "storage_classes": 300  # 5 minutes TTL
         }
+        self.cache = {}
+        # Fetches in progress, so concurrent cache misses wait for one fetch instead of each calling the API
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+
+    def is_authenticated(self):
+        """Check if the last successful authentication is still valid"""
+        return self.authenticated and (time.monotonic() - self.last_auth_time < self.auth_token_expiry)
 
     def get_cached(self, key):
         """Get a cached response if it's valid, otherwise None"""
         cache_entry = self.cache.get(key)
-        if not cache_entry:
-            return None
+        if cache_entry and cache_entry[1] > time.monotonic():
+            logger.debug("Using cached data for %s", key)
+            return cache_entry[0]
 
-        if cache_entry["data"] and (time.time() - cache_entry["timestamp"] < cache_entry["ttl"]):
-            logger.debug(f"Using cached data for {key}")
-            return cache_entry["data"]
+        return None
+
+    def get_stale(self, key):
+        """Get a cached response that has expired but may still be served while refreshing, otherwise None"""
+        cache_entry = self.cache.get(key)
+        if cache_entry and cache_entry[2] > time.monotonic():
+            return cache_entry[0]
 
         return None
 
-    def set_cache(self, key, data):
-        """Set data in the cache with current timestamp"""
-        if key in self.cache:
-            self.cache[key]["data"] = data
-            self.cache[key]["timestamp"] = time.time()
+    def hold_stale(self, key, ttl):
+        """
+        Treat a still-servable entry as fresh for ttl more seconds (never past its stale deadline),
+        so it survives a failed refresh. Returns False if there is no such entry.
+        """
+        cache_entry = self.cache.get(key)
+        now = time.monotonic()
+        if not cache_entry or cache_entry[2] <= now:
+            return False
+        fresh_deadline = max(cache_entry[1], min(now + ttl, cache_entry[2]))
+        self.cache[key] = (cache_entry[0], fresh_deadline, cache_entry[2])
+        return True
+
+    def set_cache(self, key, data, ttl=None, stale_ttl=0):
+        """
+        Set data in the cache with its expiry deadline (the key's default TTL unless ttl is given).
+        The entry may be served stale for another stale_ttl seconds after it expires.
+        """
+        if key in self.cache_ttl:
+            deadline = time.monotonic() + (ttl if ttl is not None else self.cache_ttl[key])
+            self.cache[key] = (data, deadline, deadline + stale_ttl)
 
 # Create a global session object
 okd_session = OKDSession()
@@ -54,49 +127,47 @@ okd_session = OKDSession()
 def authenticate_to_okd():
     """
     Authenticate to OpenShift using the service account token.
+    Called lazily by the first request that needs the cluster; the result is reused until it expires.
     Uses a lock to prevent concurrent authentication attempts.
     """
     global okd_session
 
     # Check if already authenticated and token is still valid
-    current_time = time.time()
-    if okd_session.authenticated and (current_time - okd_session.last_auth_time < okd_session.auth_token_expiry):
+    if okd_session.is_authenticated():
         logger.debug("Using existing OKD authentication")
         return True
 
     # Use lock to prevent concurrent authentication
     with okd_session.auth_lock:
         # Double-check if another thread already authenticated while waiting for lock
-        if okd_session.authenticated and (current_time - okd_session.last_auth_time < okd_session.auth_token_expiry):
+        if okd_session.is_authenticated():
             logger.debug("Using existing OKD authentication (after lock)")
             return True
 
+        # Don't hit the API again right after the token was rejected
+        if time.monotonic() < okd_session.auth_retry_after:
+            logger.debug("Skipping OKD authentication, last attempt failed recently")
+            return False
+
         try:
-            # Ensure .kube directory exists
-            kube_dir = os.path.expanduser("~/.kube")
-            os.makedirs(kube_dir, exist_ok=True)
-
-            # Login with token
-            login_cmd = f"oc login --server={OKD_CLUSTER_API} --token={OKD_SERVICE_ACCOUNT_TOKEN} --insecure-skip-tls-verify"
-            result = subprocess.run(login_cmd, shell=True, check=True, capture_output=True, text=True)
-
-            # Verify successful login
-            if "Logged into" in result.stdout:
-                okd_session.authenticated = True
-                okd_session.last_auth_time = time.time()
-                logger.info(f"Authentication successful: {result.stdout.strip()}")
-                return True
-            else:
-                logger.error(f"Authentication failed: {result.stdout}")
-                return False
-
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Authentication error: {e.stderr}")
+            # Validate the token by asking the API who we are
+            response = api_session.get(f"{OKD_CLUSTER_API}{WHOAMI_PATH}", timeout=API_TIMEOUT)
+            response.raise_for_status()
+
+            okd_session.authenticated = True
+            okd_session.last_auth_time = time.monotonic()
+            logger.info("Authentication successful as %s", response.json().get("metadata", {}).get("name", "unknown"))
+            return True
+
+        except requests.HTTPError as e:
+            logger.error("Authentication failed: %s %s", e.response.status_code, e.response.text)
             okd_session.authenticated = False
+            okd_session.auth_retry_after = time.monotonic() + AUTH_FAILURE_TTL
             return False
         except Exception as e:
-            logger.error(f"Unexpected authentication error: {str(e)}", exc_info=True)
+            logger.error("Unexpected authentication error: %s", e, exc_info=True)
             okd_session.authenticated = False
+            okd_session.auth_retry_after = time.monotonic() + AUTH_FAILURE_TTL
             return False
 
 def check_auth_status():
@@ -105,137 +176,255 @@ def check_auth_status():
     Does not attempt to authenticate if not.
     """
     global okd_session
-    current_time = time.time()
-    return okd_session.authenticated and (current_time - okd_session.last_auth_time < okd_session.auth_token_expiry)
+    return okd_session.is_authenticated()
 
-def get_namespaces(use_cache=True):
+def raise_for_status(response):
     """
-    Query the OpenShift cluster for all namespaces and filter out system namespaces
+    Raise requests.HTTPError for error responses.
+    A 401 also drops the cached authentication, so the next call re-validates the token.
+    """
+    if response.status_code == 401:
+        okd_session.authenticated = False
+    response.raise_for_status()
+
+def fetch_items(path):
+    """
+    Stream the items of a Kubernetes list endpoint over the shared session.
+    Items are parsed one at a time as they arrive, so a large list is never held in memory as a whole.
+    """
+    with api_session.get(f"{OKD_CLUSTER_API}{path}", timeout=API_TIMEOUT, stream=True) as response:
+        raise_for_status(response)
+        response.raw.decode_content = True  # let urllib3 undo gzip before ijson reads the body
+        yield from ijson.items(response.raw, "items.item")
+
+def parse_namespaces(items):
+    """
+    Convert namespace items into the API response format, filtering out system namespaces
     (those starting with 'openshift-' or 'kube-').
     """
-    global okd_session
+    return [
+        {
+            "name": metadata["name"],
+            "status": namespace["status"]["phase"],
+            "created": metadata["creationTimestamp"]
+        }
+        for namespace in items
+        for metadata in [namespace["metadata"]]
+        if not metadata["name"].startswith(SYSTEM_NAMESPACE_PREFIXES)
+    ]
 
+def parse_storage_classes(items):
+    """
+    Convert storage class items into the API response format.
+    """
+    storage_classes = []
+    for sc in items:
+        storage_classes.append({
+            "name": sc["metadata"]["name"],
+            "provisioner": sc["provisioner"],
+            "isDefault": "annotations" in sc["metadata"] and
+                          "storageclass.kubernetes.io/is-default-class" in sc["metadata"]["annotations"]
+        })
+    return storage_classes
+
+def claim_fetch(key):
+    """
+    Register a fetch of key in progress.
+    Returns (event, is_leader); only the leader fetches, everyone else waits on the event.
+    """
+    with okd_session.inflight_lock:
+        event = okd_session.inflight.get(key)
+        if event is not None:
+            return event, False
+        event = threading.Event()
+        okd_session.inflight[key] = event
+        return event, True
+
+def run_fetch(key, query, event):
+    """
+    Run query() as the leader of a fetch, cache its result and wake up waiting callers.
+    Failed results are cached for ERROR_CACHE_TTL seconds and never served stale; if previous
+    data can still be served stale, it is kept for that long instead of the error.
+    """
+    try:
+        result = query()
+        if result.get("status") == "error":
+            if not okd_session.hold_stale(key, ERROR_CACHE_TTL):
+                okd_session.set_cache(key, result, ERROR_CACHE_TTL)
+        else:
+            okd_session.set_cache(key, result, stale_ttl=STALE_CACHE_TTL)
+        return result
+    finally:
+        with okd_session.inflight_lock:
+            del okd_session.inflight[key]
+        event.set()
+
+def cached_fetch(key, query, use_cache=True):
+    """
+    Return the cached result for key, or run query() to refresh it.
+    Concurrent callers on a cold cache wait for the single in-flight query instead of
+    issuing their own. A recently expired result is returned at once while it is
+    refreshed on a background thread.
+    """
     # Check cache first if enabled
     if use_cache:
-        cached_data = okd_session.get_cached("namespaces")
+        cached_data = okd_session.get_cached(key)
         if cached_data:
-            logger.debug("Returning cached namespaces data")
+            logger.debug("Returning cached %s data", key)
             return cached_data
 
+        stale_data = okd_session.get_stale(key)
+        if stale_data:
+            event, is_leader = claim_fetch(key)
+            if is_leader:
+                logger.debug("Returning stale %s data, refreshing in the background", key)
+                threading.Thread(target=run_fetch, args=(key, query, event), daemon=True).start()
+            return stale_data
+
+    event, is_leader = claim_fetch(key)
+
+    if not is_leader:
+        # Another thread is already fetching - wait for it and use its result
+        event.wait(timeout=INFLIGHT_WAIT_TIMEOUT)
+        cached_data = okd_session.get_cached(key)
+        if cached_data:
+            return cached_data
+        logger.warning("Timed out waiting for in-flight %s fetch", key)
+        return query()
+
+    return run_fetch(key, query, event)
+
+def query_namespaces():
+    """
+    Query the OpenShift cluster for all namespaces and filter out system namespaces
+    (those starting with 'openshift-' or 'kube-').
+    """
     try:
         # Authenticate to OpenShift
         if not authenticate_to_okd():
             logger.error("Failed to authenticate to OpenShift cluster")
             return {"status": "error", "message": "Failed to authenticate to OpenShift"}
 
-        # Get all namespaces
-        cmd = "oc get namespaces -o json"
-        result = subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
-
-        # Parse the JSON output
-        namespaces_data = json.loads(result.stdout)
-
-        # Filter out system namespaces
-        user_namespaces = []
-        for namespace in namespaces_data.get("items", []):
-            name = namespace["metadata"]["name"]
-            if not (name.startswith("openshift-") or name.startswith("kube-")):
-                user_namespaces.append({
-                    "name": name,
-                    "status": namespace["status"]["phase"],
-                    "created": namespace["metadata"]["creationTimestamp"]
-                })
-
-        logger.info(f"Successfully fetched {len(user_namespaces)} user namespaces")
-
-        # Cache the result
-        response_data = {"status": "success", "namespaces": user_namespaces}
-        okd_session.set_cache("namespaces", response_data)
-
-        return response_data
-
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error fetching namespaces: {e.stderr}")
-        return {"status": "error", "message": f"Failed to fetch namespaces: {e.stderr}"}
-    except json.JSONDecodeError as e:
-        logger.error(f"Error parsing JSON from oc command: {e}")
+        # Get all namespaces and filter out system namespaces
+        user_namespaces = parse_namespaces(fetch_items(NAMESPACES_PATH))
+
+        logger.info("Successfully fetched %d user namespaces", len(user_namespaces))
+        return {"status": "success", "namespaces": user_namespaces}
+
+    except ijson.JSONError as e:
+        logger.error("Error parsing JSON from OpenShift API: %s", e)
         return {"status": "error", "message": f"Failed to parse namespace data: {e}"}
+    except requests.RequestException as e:
+        logger.error("Error fetching namespaces: %s", e)
+        return {"status": "error", "message": f"Failed to fetch namespaces: {str(e)}"}
     except Exception as e:
-        logger.error(f"Unexpected error fetching namespaces: {str(e)}", exc_info=True)
+        logger.error("Unexpected error fetching namespaces: %s", e, exc_info=True)
         return {"status": "error", "message": f"Unexpected error: {str(e)}"}
 
-def get_storage_classes(use_cache=True):
+def get_namespaces(use_cache=True):
     """
-    Query the OpenShift cluster for all available storage classes.
+    Get user namespaces, from the cache when possible.
     """
-    global okd_session
-
-    # Check cache first if enabled
-    if use_cache:
-        cached_data = okd_session.get_cached("storage_classes")
-        if cached_data:
-            logger.debug("Returning cached storage classes data")
-            return cached_data
+    return cached_fetch("namespaces", query_namespaces, use_cache)
 
+def query_storage_classes():
+    """
+    Query the OpenShift cluster for all available storage classes.
+    """
     try:
         # Authenticate to OpenShift
         if not authenticate_to_okd():
             logger.error("Failed to authenticate to OpenShift cluster")
             return {"status": "error", "message": "Failed to authenticate to OpenShift"}
 
-        # Get all storage classes
-        cmd = "oc get storageclass -o json"
-        result = subprocess.run(cmd, shell=True, check=True, capture_output=True, text=True)
-
-        # Parse the JSON output
-        storage_classes_data = json.loads(result.stdout)
-
-        # Extract storage class names and details
-        storage_classes = []
-        for sc in storage_classes_data.get("items", []):
-            storage_classes.append({
-                "name": sc["metadata"]["name"],
-                "provisioner": sc["provisioner"],
-                "isDefault": "annotations" in sc["metadata"] and
-                              "storageclass.kubernetes.io/is-default-class" in sc["metadata"]["annotations"]
-            })
+        # Get all storage classes and extract names and details
+        storage_classes = parse_storage_classes(fetch_items(STORAGE_CLASSES_PATH))
 
-        logger.info(f"Successfully fetched {len(storage_classes)} storage classes")
+        logger.info("Successfully fetched %d storage classes", len(storage_classes))
+        return {"status": "success", "storageClasses": storage_classes}
 
-        # Cache the result
-        response_data = {"status": "success", "storageClasses": storage_classes}
-        okd_session.set_cache("storage_classes", response_data)
-
-        return response_data
-
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error fetching storage classes: {e.stderr}")
-        return {"status": "error", "message": f"Failed to fetch storage classes: {e.stderr}"}
-    except json.JSONDecodeError as e:
-        logger.error(f"Error parsing JSON from oc command: {e}")
+    except ijson.JSONError as e:
+        logger.error("Error parsing JSON from OpenShift API: %s", e)
         return {"status": "error", "message": f"Failed to parse storage class data: {e}"}
+    except requests.RequestException as e:
+        logger.error("Error fetching storage classes: %s", e)
+        return {"status": "error", "message": f"Failed to fetch storage classes: {str(e)}"}
     except Exception as e:
-        logger.error(f"Unexpected error fetching storage classes: {str(e)}", exc_info=True)
+        logger.error("Unexpected error fetching storage classes: %s", e, exc_info=True)
         return {"status": "error", "message": f"Unexpected error: {str(e)}"}
 
-def execute_oc_command(command):
+def get_storage_classes(use_cache=True):
     """
-    Execute an OpenShift CLI command and return the results.
-    Ensures authentication before running the command.
+    Get available storage classes, from the cache when possible.
     """
-    try:
-        # Authenticate to OpenShift
-        if not authenticate_to_okd():
-            logger.error("Failed to authenticate to OpenShift cluster")
-            return {"status": "error", "message": "Failed to authenticate to OpenShift"}
+    return cached_fetch("storage_classes", query_storage_classes, use_cache)
 
-        # Execute the command
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        return {"status": "success", "output": result.stdout}
+def get_cluster_bundle(use_cache=True):
+    """
+    Get namespaces and storage classes together.
+    Returns a (namespaces_result, storage_classes_result) tuple in the same format
+    as get_namespaces() and get_storage_classes().
+    Storage classes are fetched on a worker thread while namespaces are fetched here,
+    so on a cold cache the two API requests run in parallel rather than one after the other.
+    """
+    storage_classes_future = fetch_executor.submit(get_storage_classes, use_cache)
+    namespaces_result = get_namespaces(use_cache)
+    return namespaces_result, storage_classes_future.result()
 
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error executing command '{command}': {e.stderr}")
-        return {"status": "error", "message": f"Command failed: {e.stderr}"}
+def resource_url(manifest):
+    """
+    Build the Kubernetes API URL of a single manifest (core group lives under /api, the rest under /apis).
+    """
+    kind = manifest["kind"]
+    if kind not in RESOURCE_TYPES:
+        raise ValueError(f"Unsupported resource kind '{kind}'")
+
+    plural, namespaced = RESOURCE_TYPES[kind]
+    api_version = manifest["apiVersion"]
+    group_path = f"/api/{api_version}" if "/" not in api_version else f"/apis/{api_version}"
+    metadata = manifest["metadata"]
+
+    if namespaced:
+        return f"{OKD_CLUSTER_API}{group_path}/namespaces/{metadata['namespace']}/{plural}/{metadata['name']}"
+    return f"{OKD_CLUSTER_API}{group_path}/{plural}/{metadata['name']}"
+
+def apply_manifests(yaml_content):
+    """
+    Apply multi-document YAML to the cluster with server-side apply.
+    Same create-or-update semantics as `oc apply -f`, without the oc binary.
+    """
+    applied = []
+    try:
+        for manifest in yaml.safe_load_all(yaml_content):
+            if not manifest:
+                continue
+
+            response = api_session.patch(
+                resource_url(manifest),
+                params={"fieldManager": FIELD_MANAGER, "force": "true"},
+                data=json.dumps(manifest),
+                headers={"Content-Type": "application/apply-patch+yaml"},
+                timeout=API_TIMEOUT
+            )
+            raise_for_status(response)
+            applied.append(f"{manifest['kind'].lower()}/{manifest['metadata']['name']} configured")
+
+        logger.info("Applied %d resources to OpenShift", len(applied))
+        return {"status": "success", "output": "\n".join(applied)}
+
+    except requests.HTTPError as e:
+        try:
+            message = e.response.json().get("message", e.response.text)
+        except ValueError:
+            message = e.response.text
+        logger.error("Error applying manifests: %s", message)
+        return {"status": "error", "message": f"Apply failed: {message}"}
+    except requests.RequestException as e:
+        logger.error("Error connecting to OpenShift API: %s", e)
+        return {"status": "error", "message": f"Failed to reach OpenShift API: {str(e)}"}
+    except (yaml.YAMLError, ValueError, KeyError) as e:
+        logger.error("Invalid manifest: %s", e)
+        return {"status": "error", "message": f"Invalid manifest: {str(e)}"}
     except Exception as e:
-        logger.error(f"Unexpected error executing command '{command}': {str(e)}", exc_info=True)
+        logger.error("Unexpected error applying manifests: %s", e, exc_info=True)
         return {"status": "error", "message": f"Unexpected error: {str(e)}"}
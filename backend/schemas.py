@@ -0,0 +1,74 @@
+import msgspec
+
+# Request payloads sent by the deployment form.
+# Structs are frozen and use tuples, so a parsed request is immutable and hashable.
+# Unknown fields (e.g. the form's "nameError" bookkeeping) are ignored.
+
+class StorageDetail(msgspec.Struct, frozen=True):
+    """A persistent volume requested for the deployment."""
+    name: str
+    mountPath: str
+    size: int | float  # Gi; fractional sizes such as 1.5 are valid Kubernetes quantities
+    storageClass: str
+
+class DataItem(msgspec.Struct, frozen=True):
+    """A single key of a configmap or secret, exposed as an env var or mounted as a file."""
+    name: str
+    key: str
+    value: str
+    mountType: str
+    mountPath: str = ""
+    envName: str | None = None
+
+class DeploymentRequest(msgspec.Struct, frozen=True):
+    """Everything generate_yaml needs to build the manifests of one deployment."""
+    namespace: str
+    containerImage: str
+    cpuRequest: str
+    memoryRequest: str
+    containerPort: int
+    exposeRoute: bool
+    storageRequired: bool
+    routePort: int | None = None
+    routeHostname: str = ""
+    storageDetails: tuple[StorageDetail, ...] = ()
+    secretsRequired: bool = False
+    secretsDetails: tuple[DataItem, ...] = ()
+    configmapsRequired: bool = False
+    configmapsDetails: tuple[DataItem, ...] = ()
+    createNewNamespace: bool = False
+    requesterNickname: str = ""
+
+# Optional form sections: the details list is only used (and validated) when its flag is set
+OPTIONAL_SECTIONS = (
+    ("storageRequired", "storageDetails"),
+    ("secretsRequired", "secretsDetails"),
+    ("configmapsRequired", "configmapsDetails"),
+)
+
+def normalize_storage_size(storage):
+    """Return the storage detail with a whole float size (e.g. 1.0) stored as an int."""
+    if isinstance(storage.size, float) and storage.size.is_integer():
+        return msgspec.structs.replace(storage, size=int(storage.size))
+    return storage
+
+def parse_deployment_request(data):
+    """
+    Validate a decoded JSON payload and convert it to a DeploymentRequest.
+    Numeric strings are accepted for numeric fields. Details of disabled sections are ignored,
+    since the form keeps sending half-filled entries after a section is unticked.
+    Raises msgspec.ValidationError on bad input.
+    """
+    if isinstance(data, dict):
+        data = dict(data)
+        for flag, details in OPTIONAL_SECTIONS:
+            if not data.get(flag):
+                data.pop(details, None)
+    deployment_request = msgspec.convert(data, DeploymentRequest, strict=False)
+
+    # 1 and 1.0 compare and hash equal, so store whole sizes as int: equal requests must
+    # render the same "1Gi" regardless of which one reached the generate_yaml cache first
+    if deployment_request.storageDetails:
+        storage_details = tuple(map(normalize_storage_size, deployment_request.storageDetails))
+        deployment_request = msgspec.structs.replace(deployment_request, storageDetails=storage_details)
+    return deployment_request
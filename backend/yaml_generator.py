@@ -1,19 +1,29 @@
 import yaml
-import base64
+import binascii
+import itertools
 import logging
-import re
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
-# RFC 1123 subdomain regex pattern for validation
-RFC1123_PATTERN = r'^[a-z0-9]([-a-z0-9]*[a-z0-9])?(\.[a-z0-9]([-a-z0-9]*[a-z0-9])?)*$'
+# Characters allowed in an RFC 1123 subdomain, and its maximum length
+RFC1123_CHARS = b"abcdefghijklmnopqrstuvwxyz0123456789-."
+RFC1123_MAX_LENGTH = 253
 
+# Names repeat across requests and within one (every item of a configmap or secret), so keep recent results
+@lru_cache(maxsize=512)
 def validate_resource_name(name):
     """Validate if a resource name conforms to RFC 1123 subdomain pattern."""
-    if not name:
+    # Cheap checks first: length and the characters at both ends
+    if not name or len(name) > RFC1123_MAX_LENGTH or name[0] in "-." or name[-1] in "-.":
         return False
 
-    return bool(re.match(RFC1123_PATTERN, name))
+    # Deleting every allowed byte must leave nothing behind
+    if not name.isascii() or name.encode("ascii").translate(None, RFC1123_CHARS):
+        return False
+
+    # Each dot-separated label is non-empty and starts and ends with an alphanumeric character
+    return ".." not in name and ".-" not in name and "-." not in name
 
 # Custom YAML representer to use the pipe character for multiline strings
 def represent_multiline_str(dumper, data):
@@ -21,42 +31,86 @@ def represent_multiline_str(dumper, data):
         return dumper.represent_scalar('tag:yaml.org,2002:str', data, style='|')
     return dumper.represent_scalar('tag:yaml.org,2002:str', data)
 
+# Emit through libyaml when PyYAML was built with it; the pure-Python dumper is much slower
+try:
+    from yaml import CSafeDumper as BaseDumper
+except ImportError:
+    from yaml import SafeDumper as BaseDumper
+
+# Largest line width libyaml accepts, i.e. never fold long scalars
+MAX_LINE_WIDTH = 2**31 - 1
+
+class ManifestDumper(BaseDumper):
+    """Safe YAML dumper used for generated manifests."""
+
+    def ignore_aliases(self, data):
+        # Manifests are plain trees; never look for shared nodes or emit &anchors
+        return True
+
+class MultilineManifestDumper(ManifestDumper):
+    """Manifest dumper that writes multiline strings as | blocks; only used when a configmap value needs it."""
+
 # Register our custom representer
-yaml.add_representer(str, represent_multiline_str)
+MultilineManifestDumper.add_representer(str, represent_multiline_str)
+
+def object_metadata(name, namespace):
+    """Metadata of a namespaced object."""
+    return {"name": name, "namespace": namespace}
 
 def generate_yaml(data):
-    """Generate YAML manifests for OpenShift deployment."""
-    namespace = data["namespace"]
+    """Generate YAML manifests for OpenShift deployment from a validated schemas.DeploymentRequest."""
+    # Requests with secrets are never memoized, so plaintext values and their Secret
+    # manifests do not stay in worker memory after the request
+    if data.secretsRequired:
+        return render_yaml(data)
+    return cached_render_yaml(data)
+
+def render_yaml(data):
+    """Build and emit the manifests of one deployment request."""
+    namespace = data.namespace
 
     # Validate namespace name
     if not validate_resource_name(namespace):
         raise ValueError(f"Invalid namespace name '{namespace}'. Must match RFC 1123 pattern: lowercase alphanumeric characters, '-' or '.', must start and end with alphanumeric.")
 
-    container_image = data["containerImage"]
-    cpu_request = data["cpuRequest"]
-    memory_request = data["memoryRequest"]
-    container_port = int(data["containerPort"])  # Ensure int format
-    expose_route = data["exposeRoute"]
+    container_image = data.containerImage
+    cpu_request = data.cpuRequest
+    memory_request = data.memoryRequest
+    container_port = data.containerPort
+    expose_route = data.exposeRoute
 
-    route_port = int(data["routePort"]) if expose_route else None
-    route_hostname = data["routeHostname"] if expose_route else None  # Full hostname
+    route_port = data.routePort if expose_route else None
+    route_hostname = data.routeHostname if expose_route else None  # Full hostname
 
     # Validate route hostname if provided
     if route_hostname and not validate_resource_name(route_hostname):
         raise ValueError(f"Invalid route hostname '{route_hostname}'. Must match RFC 1123 pattern.")
 
-    storage_required = data["storageRequired"]
-    storage_details = data["storageDetails"] if storage_required else []
+    # Names of the resources derived from the namespace, built and validated once
+    deployment_name = f"{namespace}-deployment"
+    if not validate_resource_name(deployment_name):
+        raise ValueError(f"Invalid deployment name '{deployment_name}'. Must match RFC 1123 pattern.")
+
+    service_name = f"{namespace}-service"
+    if not validate_resource_name(service_name):
+        raise ValueError(f"Invalid service name '{service_name}'. Must match RFC 1123 pattern.")
 
-    secrets_required = data.get("secretsRequired", False)
-    secrets_details = data.get("secretsDetails", []) if secrets_required else []
+    route_name = f"{namespace}-route" if route_hostname else None
+    if route_name and not validate_resource_name(route_name):
+        raise ValueError(f"Invalid route name '{route_name}'. Must match RFC 1123 pattern.")
 
-    configmaps_required = data.get("configmapsRequired", False)
-    configmaps_details = data.get("configmapsDetails", []) if configmaps_required else []
+    storage_required = data.storageRequired
+    storage_details = data.storageDetails if storage_required else ()
+
+    secrets_required = data.secretsRequired
+    secrets_details = data.secretsDetails if secrets_required else ()
+
+    configmaps_required = data.configmapsRequired
+    configmaps_details = data.configmapsDetails if configmaps_required else ()
 
     # Check if it's a new namespace
-    create_namespace = data.get("createNewNamespace", False)
-    requester_nickname = data.get("requesterNickname", "")
+    create_namespace = data.createNewNamespace
+    requester_nickname = data.requesterNickname
 
     # Namespace YAML (only if creating a new namespace)
     namespace_yaml = None
@@ -72,21 +126,19 @@ def generate_yaml(data):
             }
         }
 
-    # Deployment YAML
-    deployment_name = f"{namespace}-deployment"
-    # Validate deployment name
-    if not validate_resource_name(deployment_name):
-        raise ValueError(f"Invalid deployment name '{deployment_name}'. Must match RFC 1123 pattern.")
+    # Pod labels, shared by the deployment selector, its pod template and the service selector
+    app_labels = {"app": namespace}
 
+    # Deployment YAML
     deployment_yaml = {
         "apiVersion": "apps/v1",
         "kind": "Deployment",
-        "metadata": {"name": deployment_name, "namespace": namespace},
+        "metadata": object_metadata(deployment_name, namespace),
         "spec": {
             "replicas": 1,
-            "selector": {"matchLabels": {"app": namespace}},
+            "selector": {"matchLabels": app_labels},
             "template": {
-                "metadata": {"labels": {"app": namespace}},
+                "metadata": {"labels": app_labels},
                 "spec": {
                     "containers": [
                         {
@@ -106,25 +158,33 @@ def generate_yaml(data):
         }
     }
 
+    # Direct references to the lists that the sections below append to
+    pod_spec = deployment_yaml["spec"]["template"]["spec"]
+    container = pod_spec["containers"][0]
+    volumes = pod_spec["volumes"]
+    volume_names = set()  # Names in volumes, for O(1) "already added" checks
+    volume_mounts = container["volumeMounts"]
+    env = container["env"]
+
     # Storage Configuration (if enabled)
     persistent_volumes_yaml = []
     if storage_required:
         for storage in storage_details:
-            volume_name = storage["name"]
+            volume_name = storage.name
 
             # Validate volume name
             if not validate_resource_name(volume_name):
                 raise ValueError(f"Invalid volume name '{volume_name}'. Must match RFC 1123 pattern.")
 
-            mount_path = storage["mountPath"]
-            volume_size = f"{storage['size']}Gi"
-            storage_class = storage["storageClass"]
+            mount_path = storage.mountPath
+            volume_size = f"{storage.size}Gi"
+            storage_class = storage.storageClass
 
             # PVC YAML
             pvc_yaml = {
                 "apiVersion": "v1",
                 "kind": "PersistentVolumeClaim",
-                "metadata": {"name": volume_name, "namespace": namespace},
+                "metadata": object_metadata(volume_name, namespace),
                 "spec": {
                     "accessModes": ["ReadWriteOnce"],
                     "resources": {"requests": {"storage": volume_size}},
@@ -134,14 +194,15 @@ def generate_yaml(data):
             persistent_volumes_yaml.append(pvc_yaml)
 
             # Add volume mount in Deployment
-            deployment_yaml["spec"]["template"]["spec"]["containers"][0]["volumeMounts"].append({
+            volume_mounts.append({
                 "name": volume_name,
                 "mountPath": mount_path
             })
-            deployment_yaml["spec"]["template"]["spec"]["volumes"].append({
+            volumes.append({
                 "name": volume_name,
                 "persistentVolumeClaim": {"claimName": volume_name}
             })
+            volume_names.add(volume_name)
 
     # ConfigMaps Configuration (if enabled)
     configmaps_yaml = []
@@ -149,23 +210,20 @@ def generate_yaml(data):
         # Group configmap items by their name to create proper configmap objects
         configmap_groups = {}
         for configmap_detail in configmaps_details:
-            configmap_name = configmap_detail["name"]
+            configmap_groups.setdefault(configmap_detail.name, []).append(configmap_detail)
 
-            # Validate configmap name
+        # Validate each configmap name once, however many keys it has
+        for configmap_name in configmap_groups:
             if not validate_resource_name(configmap_name):
                 raise ValueError(f"Invalid configmap name '{configmap_name}'. Must match RFC 1123 pattern.")
 
-            if configmap_name not in configmap_groups:
-                configmap_groups[configmap_name] = []
-            configmap_groups[configmap_name].append(configmap_detail)
-
         # Create configmap objects for each group
         for configmap_name, configmap_items in configmap_groups.items():
             # Create the configmap data
             configmap_data = {}
             for item in configmap_items:
-                key = item["key"]
-                value = item["value"]
+                key = item.key
+                value = item.value
 
                 # The registered custom representer will handle multiline strings properly
                 configmap_data[key] = value
@@ -174,36 +232,30 @@ def generate_yaml(data):
             configmap_yaml = {
                 "apiVersion": "v1",
                 "kind": "ConfigMap",
-                "metadata": {"name": configmap_name, "namespace": namespace},
+                "metadata": object_metadata(configmap_name, namespace),
                 "data": configmap_data
             }
             configmaps_yaml.append(configmap_yaml)
 
             # Add references to deployment
             for item in configmap_items:
-                if item["mountType"] == "env":
+                if item.mountType == "env":
                     # Environment variable mount
-                    env_name = item.get("envName", item["key"])  # Use key name if envName not provided
-                    deployment_yaml["spec"]["template"]["spec"]["containers"][0]["env"].append({
+                    env_name = item.envName if item.envName is not None else item.key  # Use key name if envName not provided
+                    env.append({
                         "name": env_name,
                         "valueFrom": {
                             "configMapKeyRef": {
                                 "name": configmap_name,
-                                "key": item["key"]
+                                "key": item.key
                             }
                         }
                     })
                 else:  # Volume mount
-                    # Check if volume already exists
-                    volume_exists = False
-                    for volume in deployment_yaml["spec"]["template"]["spec"]["volumes"]:
-                        if volume.get("name") == configmap_name:
-                            volume_exists = True
-                            break
-
                     # Add volume if it doesn't exist
-                    if not volume_exists:
-                        deployment_yaml["spec"]["template"]["spec"]["volumes"].append({
+                    if configmap_name not in volume_names:
+                        volume_names.add(configmap_name)
+                        volumes.append({
                             "name": configmap_name,
                             "configMap": {
                                 "name": configmap_name
@@ -211,10 +263,10 @@ def generate_yaml(data):
                         })
 
                     # Add volume mount
-                    deployment_yaml["spec"]["template"]["spec"]["containers"][0]["volumeMounts"].append({
+                    volume_mounts.append({
                         "name": configmap_name,
-                        "mountPath": item["mountPath"],
-                        "subPath": item["key"]
+                        "mountPath": item.mountPath,
+                        "subPath": item.key
                     })
 
     # Secrets Configuration (if enabled)
@@ -223,29 +275,26 @@ def generate_yaml(data):
         # Group secrets by their name to create proper secret objects
         secret_groups = {}
         for secret_detail in secrets_details:
-            secret_name = secret_detail["name"]
+            secret_groups.setdefault(secret_detail.name, []).append(secret_detail)
 
-            # Validate secret name
+        # Validate each secret name once, however many keys it has
+        for secret_name in secret_groups:
             if not validate_resource_name(secret_name):
                 raise ValueError(f"Invalid secret name '{secret_name}'. Must match RFC 1123 pattern.")
 
-            if secret_name not in secret_groups:
-                secret_groups[secret_name] = []
-            secret_groups[secret_name].append(secret_detail)
-
         # Create secret objects for each group
         for secret_name, secret_items in secret_groups.items():
-            # Create the secret data
-            secret_data = {}
-            for item in secret_items:
-                # Base64 encode the value
-                secret_data[item["key"]] = base64.b64encode(item["value"].encode()).decode()
+            # Create the secret data with base64 encoded values
+            secret_data = {
+                item.key: binascii.b2a_base64(item.value.encode("utf-8"), newline=False).decode("ascii")
+                for item in secret_items
+            }
 
             # Create the secret YAML
             secret_yaml = {
                 "apiVersion": "v1",
                 "kind": "Secret",
-                "metadata": {"name": secret_name, "namespace": namespace},
+                "metadata": object_metadata(secret_name, namespace),
                 "type": "Opaque",
                 "data": secret_data
             }
@@ -253,29 +302,23 @@ def generate_yaml(data):
 
             # Add references to deployment
             for item in secret_items:
-                if item["mountType"] == "env":
+                if item.mountType == "env":
                     # Environment variable mount
-                    env_name = item.get("envName", item["key"])  # Use key name if envName not provided
-                    deployment_yaml["spec"]["template"]["spec"]["containers"][0]["env"].append({
+                    env_name = item.envName if item.envName is not None else item.key  # Use key name if envName not provided
+                    env.append({
                         "name": env_name,
                         "valueFrom": {
                             "secretKeyRef": {
                                 "name": secret_name,
-                                "key": item["key"]
+                                "key": item.key
                             }
                         }
                     })
                 else:  # Volume mount
-                    # Check if volume already exists
-                    volume_exists = False
-                    for volume in deployment_yaml["spec"]["template"]["spec"]["volumes"]:
-                        if volume.get("name") == secret_name:
-                            volume_exists = True
-                            break
-
                     # Add volume if it doesn't exist
-                    if not volume_exists:
-                        deployment_yaml["spec"]["template"]["spec"]["volumes"].append({
+                    if secret_name not in volume_names:
+                        volume_names.add(secret_name)
+                        volumes.append({
                             "name": secret_name,
                             "secret": {
                                 "secretName": secret_name
@@ -283,25 +326,19 @@ def generate_yaml(data):
                         })
 
                     # Add volume mount
-                    deployment_yaml["spec"]["template"]["spec"]["containers"][0]["volumeMounts"].append({
+                    volume_mounts.append({
                         "name": secret_name,
-                        "mountPath": item["mountPath"],
-                        "subPath": item["key"]
+                        "mountPath": item.mountPath,
+                        "subPath": item.key
                     })
 
     # Service YAML
-    service_name = f"{namespace}-service"
-
-    # Validate service name
-    if not validate_resource_name(service_name):
-        raise ValueError(f"Invalid service name '{service_name}'. Must match RFC 1123 pattern.")
-
     service_yaml = {
         "apiVersion": "v1",
         "kind": "Service",
-        "metadata": {"name": service_name, "namespace": namespace},
+        "metadata": object_metadata(service_name, namespace),
         "spec": {
-            "selector": {"app": namespace},
+            "selector": app_labels,
             "ports": [{"protocol": "TCP", "port": container_port, "targetPort": container_port}]
         }
     }
@@ -309,16 +346,10 @@ def generate_yaml(data):
     # Route YAML (if requested)
     route_yaml = None
     if expose_route and route_hostname:
-        route_name = f"{namespace}-route"
-
-        # Validate route name
-        if not validate_resource_name(route_name):
-            raise ValueError(f"Invalid route name '{route_name}'. Must match RFC 1123 pattern.")
-
         route_yaml = {
             "apiVersion": "route.openshift.io/v1",
             "kind": "Route",
-            "metadata": {"name": route_name, "namespace": namespace},
+            "metadata": object_metadata(route_name, namespace),
             "spec": {
                 "to": {"kind": "Service", "name": service_name},
                 "port": {"targetPort": container_port},  # Uses the correct service port
@@ -327,25 +358,35 @@ def generate_yaml(data):
             }
         }
 
-    # Compile YAML Output
-    yaml_documents = []
-
-    # Only add namespace YAML if creating a new namespace
-    if namespace_yaml:
-        yaml_documents.append(yaml.dump(namespace_yaml))
-
-    yaml_documents.extend([
-        yaml.dump(deployment_yaml),
-        yaml.dump(service_yaml)
-    ])
-
-    if persistent_volumes_yaml:
-        yaml_documents.extend([yaml.dump(pvc) for pvc in persistent_volumes_yaml])
-    if configmaps_yaml:
-        yaml_documents.extend([yaml.dump(configmap) for configmap in configmaps_yaml])
-    if secrets_yaml:
-        yaml_documents.extend([yaml.dump(secret) for secret in secrets_yaml])
-    if route_yaml:
-        yaml_documents.append(yaml.dump(route_yaml))
-
-    return "\n---\n".join(yaml_documents)
+    # Compile YAML Output, streamed straight into the dumper
+    # (the namespace is only included when creating a new one)
+    # Only configmap values are written verbatim and may span lines; without any, every string
+    # goes through the stock representer instead of the multiline check
+    if any("\n" in item.value for item in configmaps_details):
+        dumper = MultilineManifestDumper
+    else:
+        dumper = ManifestDumper
+
+    yaml_documents = itertools.chain(
+        [namespace_yaml] if namespace_yaml else (),
+        [deployment_yaml, service_yaml],
+        persistent_volumes_yaml,
+        configmaps_yaml,
+        secrets_yaml,
+        [route_yaml] if route_yaml else ()
+    )
+
+    # dump_all writes the "---" separators itself, in one pass over all documents
+    # Long values are never folded and non-ASCII text is written as-is rather than escaped
+    return yaml.dump_all(
+        yaml_documents,
+        Dumper=dumper,
+        default_flow_style=False,
+        sort_keys=False,
+        allow_unicode=True,
+        width=MAX_LINE_WIDTH
+    )
+
+# Requests are frozen structs, so identical form submissions (e.g. regenerating before a deploy)
+# hit the cache instead of rebuilding and re-emitting every manifest
+cached_render_yaml = lru_cache(maxsize=256)(render_yaml)